@@ -1,7 +1,11 @@
 import gspread
+from gspread.urls import DRIVE_FILES_API_V3_URL
 from google.oauth2.service_account import Credentials
-import pandas as pd
+import pyarrow as pa
 from datetime import datetime
+import functools
+import hashlib
+import io
 import os
 
 SCOPES = [
@@ -9,22 +13,105 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive"
 ]
 
-creds = Credentials.from_service_account_file("service_account.json", scopes=SCOPES)
-gc = gspread.authorize(creds)
-
 SPREADSHEET_ID = "13c6B7t3Enm9l1JVM1rU0fvUg1Q9p9CGGUJJhxVD5GKk"
 
-sh = gc.open_by_key(SPREADSHEET_ID)
-ws = sh.sheet1
+OUTPUT_FILE = "latest_schedule.arrow"
+HASH_FILE = OUTPUT_FILE + ".sha256"
+
+
+def write_if_changed(blob: bytes, path: str, hash_path: str):
+    """
+    Atomically replace path with blob, unless hash_path says the
+    content is unchanged. Returns True if the file was rewritten.
+    """
+    digest = hashlib.sha256(blob).hexdigest()
+
+    if os.path.exists(path) and os.path.exists(hash_path):
+        with open(hash_path) as f:
+            if f.read().strip() == digest:
+                return False
+
+    # Write next to the target and rename, so readers never see a partial file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+    with open(hash_path, "w") as f:
+        f.write(digest)
+
+    return True
+
+
+@functools.lru_cache(maxsize=1)
+def _client():
+    """
+    Build the authorized gspread client on first use and reuse it
+    afterwards, so scheduler ticks don't redo credential setup.
+    """
+    creds = Credentials.from_service_account_file("service_account.json", scopes=SCOPES)
+    return gspread.authorize(creds)
+
+
+def open_spreadsheet():
+    """Open the schedule spreadsheet with the shared client."""
+    return _client().open_by_key(SPREADSHEET_ID)
+
+
+def sheet_modified_time():
+    """
+    Return the spreadsheet's Drive modifiedTime.
+    Asks Drive directly through the shared client's session rather than
+    via open_by_key, which would first fetch the full Sheets metadata,
+    so a poll is a single small request.
+    """
+    response = _client().http_client.request(
+        "get",
+        f"{DRIVE_FILES_API_V3_URL}/{SPREADSHEET_ID}",
+        params={"fields": "modifiedTime", "supportsAllDrives": True},
+    )
+    return response.json()["modifiedTime"]
+
+
+def values_to_table(values):
+    """
+    Turn a get_all_values() grid (header row first) into a string-typed
+    pyarrow Table, without going through a pandas DataFrame.
+    """
+    if not values:
+        return pa.table({})
+
+    header, rows = values[0], values[1:]
+    columns = zip(*rows) if rows else [[] for _ in header]
+    arrays = [pa.array(col, type=pa.string()) for col in columns]
+    return pa.Table.from_arrays(arrays, names=header)
+
+
+def fetch_sheet():
+    """
+    Download the first worksheet and save it to OUTPUT_FILE.
+    The file is only rewritten when the sheet content changed, so the
+    dashboard cache (keyed on file mtime) survives unchanged fetches.
+    Returns the fetched pyarrow Table.
+    """
+    ws = open_spreadsheet().sheet1
+
+    # One call for the whole grid; first row is the header
+    values = ws.get_all_values()
+    table = values_to_table(values)
 
-data = ws.get_all_records()
+    # Uncompressed Arrow IPC file, so the dashboard can memory-map it
+    buf = io.BytesIO()
+    with pa.ipc.new_file(buf, table.schema) as writer:
+        writer.write_table(table)
+    write_if_changed(buf.getvalue(), OUTPUT_FILE, HASH_FILE)
 
-df = pd.DataFrame(data)
+    return table
 
-OUTPUT_FILE = "latest_schedule.csv"
 
-df.to_csv(OUTPUT_FILE, index=False)
+if __name__ == "__main__":
+    table = fetch_sheet()
 
-print("Saved CSV to:", os.path.abspath(OUTPUT_FILE))
-print("Preview:")
-print(df.head())
+    print("Saved Arrow file to:", os.path.abspath(OUTPUT_FILE))
+    print("Preview:")
+    print(table.slice(0, 5).to_pandas())
@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
+import pyarrow as pa
+import plotly.graph_objects as go
 from datetime import datetime
+import hashlib
+import os
 
 import gspread
 from google.oauth2.service_account import Credentials
@@ -85,54 +88,271 @@ def parse_interval_smart(interval: str):
     return start, end, fixed, ""
 
 
+def fix_intervals(start, end):
+    """
+    Apply the end <= start auto-fix to int32 minute arrays in place.
+    Returns a boolean mask of the rows that were fixed.
+    """
+    # Add 12 hours, and if that is still not enough, another 24 hours.
+    # int32 scalars keep offset int32, so it adds to end without a cast.
+    offset = np.where(
+        end > start,
+        np.int32(0),
+        np.where(end + np.int32(720) > start, np.int32(720), np.int32(720 + 1440)),
+    )
+    end += offset
+    return offset != 0
+
+
+# Stricter than parse_interval_smart: hours must be 1-2 digits and minutes
+# exactly 2, so "9:5-10:00", "100:00-101:00" or "1:000-2:00" are reported
+# as "Bad time format" here but still parse with debug=True.
+TIME_PATTERN = r"^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})$"
+
+# ErrorCode values; OK means the interval is valid
+OK = 0
+NON_STRING = 1
+MISSING_DASH = 2
+NON_TIME = 3
+BAD_FORMAT = 4
+DURATION_TOO_LONG = 5
+
+# ErrorCode -> message, indexable with an array of codes
+_MESSAGES = {
+    OK: "",
+    NON_STRING: "Non-string interval",
+    MISSING_DASH: "Missing dash",
+    NON_TIME: "Non-time entry (ONLINE/TBA)",
+    BAD_FORMAT: "Bad time format",
+    DURATION_TOO_LONG: "Duration too long (over 300 min)",
+}
+ERROR_MESSAGES = np.array([_MESSAGES[code] for code in range(len(_MESSAGES))], dtype=object)
+ERROR_CODES = {msg: code for code, msg in _MESSAGES.items()}
+
+def parse_intervals(times: pd.Series):
+    """
+    Vectorized version of parse_interval_smart for a whole column.
+    Same error precedence, but times must match TIME_PATTERN.
+    Returns a DataFrame with Start_Min, End_Min, AutoFixed, ErrorCode
+    (an int8 index into ERROR_MESSAGES).
+    """
+    parts = times.str.extract(TIME_PATTERN).astype(float).to_numpy()
+    bad_format = np.isnan(parts).any(axis=1)
+    parts = np.nan_to_num(parts).astype(np.int32)
+
+    start = parts[:, 0] * 60 + parts[:, 1]
+    end = parts[:, 2] * 60 + parts[:, 3]
+
+    fixed = fix_intervals(start, end)
+
+    duration = end - start
+
+    non_string = times.isna().to_numpy()
+    missing_dash = ~times.str.contains("-", regex=False, na=False).to_numpy()
+    non_time = times.str.upper().str.contains("ONLINE|TBA|NA", regex=True, na=False).to_numpy()
+    too_long = duration > 300
+
+    # Same precedence as parse_interval_smart
+    error = np.select(
+        [non_string, missing_dash, non_time, bad_format, too_long],
+        [NON_STRING, MISSING_DASH, NON_TIME, BAD_FORMAT, DURATION_TOO_LONG],
+        default=OK,
+    ).astype(np.int8)
+
+    unparsed = non_string | missing_dash | non_time | bad_format
+
+    return pd.DataFrame(
+        {
+            "Start_Min": np.where(unparsed, np.nan, start),
+            "End_Min": np.where(unparsed, np.nan, end),
+            "AutoFixed": fixed & (error == OK),
+            "ErrorCode": error,
+        },
+        index=times.index,
+    )
+
+
 # -------------------------------------------------------------
 # ---------------------- PREPROCESS DATA -----------------------
 # -------------------------------------------------------------
 
-def preprocess_data(df):
-    df = df.copy()
+# Single-pass character cleanup: unify dashes, "." -> ":", drop spaces
+TIMES_TRANSLATION = str.maketrans({"–": "-", "—": "-", ".": ":", " ": None})
+DAYS_TRANSLATION = str.maketrans({" ": None})
 
+def preprocess_data(df, debug=False):
+    """
+    Clean the raw schedule and return (df_valid, error_codes), where
+    error_codes is an int8 ErrorCode Series aligned with df's index.
+    Set debug=True to parse with the row-by-row parse_interval_smart
+    instead of the vectorized parse_intervals (which is stricter about
+    the time format, see TIME_PATTERN).
+    """
     required_cols = ["Days", "Class_Times", "Hall"]
     missing = [c for c in required_cols if c not in df.columns]
 
     if missing:
         st.error(f"Missing required columns: {', '.join(missing)}")
-        return pd.DataFrame(), pd.DataFrame()
-
-    # Clean Days + Class_Times formatting
-    df["Days"] = df["Days"].astype(str).str.upper().str.replace(" ", "")
-    df["Class_Times"] = (
-        df["Class_Times"]
-        .astype(str)
-        .str.replace("–", "-", regex=False)
-        .str.replace("—", "-", regex=False)
-        .str.replace(".", ":", regex=False)
-        .str.replace(" ", "")
+        return pd.DataFrame(), pd.Series(dtype=np.int8)
+
+    # Clean Days + Class_Times formatting (assign returns a new frame,
+    # so the caller's DataFrame is left untouched without a full copy)
+    df = df.assign(
+        Days=df["Days"].astype(str).str.upper().str.translate(DAYS_TRANSLATION),
+        Class_Times=df["Class_Times"].astype(str).str.translate(TIMES_TRANSLATION),
     )
 
     # Smart parse time intervals
-    parsed = df["Class_Times"].apply(lambda x: pd.Series(parse_interval_smart(x)))
-    parsed.columns = ["Start_Min", "End_Min", "AutoFixed", "ErrorMessage"]
-    df = pd.concat([df, parsed], axis=1)
+    if debug:
+        parsed = df["Class_Times"].apply(lambda x: pd.Series(parse_interval_smart(x)))
+        parsed.columns = ["Start_Min", "End_Min", "AutoFixed", "ErrorMessage"]
+        # The only message not in ERROR_CODES is the "Duration too long (N min)" one
+        codes = parsed.pop("ErrorMessage").map(lambda m: ERROR_CODES.get(m, DURATION_TOO_LONG))
+        parsed["ErrorCode"] = codes.astype(np.int8)
+    else:
+        parsed = parse_intervals(df["Class_Times"])
 
     # Duration
-    df["Duration"] = df["End_Min"] - df["Start_Min"]
+    df = df.join(parsed.assign(Duration=parsed["End_Min"] - parsed["Start_Min"]))
 
-    # Errors and valids
-    df_errors = df[df["ErrorMessage"] != ""]
-    df_valid = df[df["ErrorMessage"] == ""].copy()
+    # Only the valid rows are materialized; errors stay as compact codes
+    error_codes = df.pop("ErrorCode")
+    is_valid = (error_codes == OK).to_numpy()
 
     # Create Start_Hour (used in dashboard filters and charts)
-    df_valid["Start_Hour"] = (df_valid["Start_Min"] // 60).astype(int)
+    df_valid = df[is_valid].assign(Start_Hour=lambda d: (d["Start_Min"] // 60).astype(int))
+
+    # Low-cardinality keys: categorical codes make grouping and filtering integer ops
+    df_valid = df_valid.astype({"Hall": "category", "Days": "category"})
 
-    return df_valid, df_errors
+    return df_valid, error_codes
+
+
+def errors_view(raw_df, error_codes):
+    """
+    Build the invalid-rows table (as entered in the sheet) from the
+    error codes. Only called when there is something to show.
+    """
+    bad = (error_codes != OK).to_numpy()
+    return raw_df.loc[bad, ["Class_Times", "Days", "Hall"]].assign(
+        ErrorMessage=ERROR_MESSAGES[error_codes.to_numpy()[bad]]
+    )
 
 
 # -------------------------------------------------------------
 # ------------------------- LOAD DATA --------------------------
 # -------------------------------------------------------------
 
+DATA_FILE = "latest_schedule.arrow"
 
+def load_latest_data():
+    """
+    Read the Arrow IPC file written by fetch_from_gsheet.py / scheduler.py.
+    The file is memory-mapped and wrapped in Arrow-backed columns, so
+    loading it needs no parsing or decompression. get_clean_data still
+    caches (and pickles) the result per process.
+    """
+    with pa.memory_map(DATA_FILE, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+@st.cache_data(show_spinner=False)
+def get_clean_data(mtime: float):
+    """
+    Load and preprocess the latest data file once per file version.
+    mtime is only used as the cache key, so a rewrite by the
+    scheduler invalidates the cache.
+    """
+    raw_df = load_latest_data()
+    df_valid, error_codes = preprocess_data(raw_df)
+    return raw_df, df_valid, error_codes
+
+
+def content_digest(df):
+    """
+    SHA-256 over the column names and the per-row hashes in order, used as
+    data_key for data that has no file mtime (the Google Sheet fallback).
+    """
+    h = hashlib.sha256(repr(list(df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+# -------------------------------------------------------------
+# ------------------------ AGGREGATIONS ------------------------
+# -------------------------------------------------------------
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def compute_aggs(data_key, _df_valid):
+    """
+    Chart aggregations over all valid rows. They don't depend on the
+    filters, so they are computed once per data_key (the DataFrame
+    itself is not hashed, like in the figure builders below).
+    Returns (hall_counts, hall_minutes, hour_counts).
+    """
+    df_valid = _df_valid
+    hall_counts = df_valid["Hall"].value_counts().rename_axis("Hall").reset_index(name="Count")
+    hall_minutes = df_valid.groupby("Hall", observed=True)["Duration"].sum().reset_index(name="Total_Minutes")
+    # Start_Hour is an integer hour, so a bincount is the whole histogram;
+    # int32 matches the typed-array dtype the chart sends
+    start_hours = df_valid["Start_Hour"].to_numpy(dtype=np.int32)
+    hour_counts = np.bincount(start_hours, minlength=24).astype(np.int32)
+    return hall_counts, hall_minutes, hour_counts
+
+
+# -------------------------------------------------------------
+# --------------------------- CHARTS ---------------------------
+# -------------------------------------------------------------
+
+# The charts depend only on df_valid (not on the filters), so each figure
+# is built once per data version. data_key identifies that version; the
+# leading underscore stops Streamlit from hashing the DataFrame itself.
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_hall_count_fig(data_key, _df_valid):
+    hall_counts, _, _ = compute_aggs(data_key, _df_valid)
+
+    # NumPy arrays with explicit dtypes go over the wire as base64 typed arrays
+    counts = hall_counts["Count"].to_numpy().astype(np.int32)
+    fig = go.Figure(go.Bar(x=hall_counts["Hall"].to_numpy(), y=counts, text=counts))
+    fig.update_layout(
+        title="Number of Classes per Hall",
+        xaxis_title="Hall",
+        yaxis_title="Count"
+    )
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_hall_minutes_fig(data_key, _df_valid):
+    _, hall_minutes, _ = compute_aggs(data_key, _df_valid)
+
+    minutes = hall_minutes["Total_Minutes"].to_numpy().astype(np.float32)
+    fig = go.Figure(go.Bar(x=hall_minutes["Hall"].to_numpy(), y=minutes, text=minutes))
+    fig.update_layout(
+        title="Total Usage (Minutes) per Hall",
+        xaxis_title="Hall",
+        yaxis_title="Total_Minutes"
+    )
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_start_hour_fig(data_key, _df_valid):
+    _, _, hour_counts = compute_aggs(data_key, _df_valid)
+
+    # Plot the precomputed per-hour counts: a len(hour_counts) payload
+    # instead of one value per row for plotly to rebin. len() rather than
+    # 24, since a malformed sheet can have start hours past 23.
+    fig = go.Figure(go.Bar(
+        x=np.arange(len(hour_counts), dtype=np.int32),
+        y=hour_counts
+    ))
+    fig.update_layout(
+        title="Class Start Time Distribution",
+        xaxis_title="Start_Hour",
+        yaxis_title="count",
+        bargap=0  # adjacent bins, like the old px.histogram
+    )
+    return fig
 
 
 # -------------------------------------------------------------
@@ -144,11 +364,16 @@ def main():
     st.title("🎓 KIMEP Classroom Occupancy Dashboard")
 
     # --- Load data ---
-    raw_df = load_from_gsheet()
-
-    df_valid, df_errors = preprocess_data(raw_df)
-
-    st.success("Data loaded successfully from latest_schedule.csv")
+    # data_key identifies the data version for the cached charts
+    if os.path.exists(DATA_FILE):
+        data_key = os.path.getmtime(DATA_FILE)
+        raw_df, df_valid, error_codes = get_clean_data(data_key)
+        st.success(f"Data loaded successfully from {DATA_FILE}")
+    else:
+        raw_df = load_from_gsheet()
+        data_key = content_digest(raw_df)
+        df_valid, error_codes = preprocess_data(raw_df)
+        st.success("Data loaded successfully from Google Sheet")
 
     # ---------------------------------------------------------
     # --- SECTION: Show raw data & cleaned data
@@ -159,9 +384,10 @@ def main():
     with st.expander("Cleaned Valid Data"):
         st.dataframe(df_valid)
 
-    if not df_errors.empty:
+    if (error_codes != OK).any():
+        df_errors = errors_view(raw_df, error_codes)
         with st.expander("⚠ Invalid Time Intervals Detected"):
-            st.dataframe(df_errors[["Class_Times", "Days", "Hall", "ErrorMessage"]])
+            st.dataframe(df_errors)
             st.warning(f"{len(df_errors)} invalid entries detected. These were excluded from analysis.")
 
     # ---------------------------------------------------------
@@ -170,24 +396,29 @@ def main():
 
     st.header("🔍 Filters")
 
-    hall_list = sorted(df_valid["Hall"].dropna().unique().tolist())
-    day_list = sorted(df_valid["Days"].dropna().unique().tolist())
+    # Categories are already sorted and exclude missing values
+    hall_list = df_valid["Hall"].cat.categories.tolist()
+    day_list = df_valid["Days"].cat.categories.tolist()
     hour_list = sorted(df_valid["Start_Hour"].dropna().unique().tolist())
 
     selected_hall = st.selectbox("Filter by Hall:", ["All"] + hall_list)
     selected_day = st.selectbox("Filter by Day:", ["All"] + day_list)
     selected_hour = st.selectbox("Filter by Start Hour:", ["All"] + list(map(str, hour_list)))
 
-    df_filtered = df_valid.copy()
+    # Combine the active filters into one query (a single pass, no copy)
+    conds = []
 
     if selected_hall != "All":
-        df_filtered = df_filtered[df_filtered["Hall"] == selected_hall]
+        conds.append("Hall == @selected_hall")
 
     if selected_day != "All":
-        df_filtered = df_filtered[df_filtered["Days"] == selected_day]
+        conds.append("Days == @selected_day")
 
     if selected_hour != "All":
-        df_filtered = df_filtered[df_filtered["Start_Hour"] == int(selected_hour)]
+        start_hour = int(selected_hour)
+        conds.append("Start_Hour == @start_hour")
+
+    df_filtered = df_valid.query(" and ".join(conds)) if conds else df_valid
 
     st.subheader("Filtered Data")
     st.dataframe(df_filtered)
@@ -197,50 +428,21 @@ def main():
     # ---------------------------------------------------------
 
     st.header("🏫 Hall Usage Frequency")
-
-    hall_counts = df_valid["Hall"].value_counts().reset_index()
-    hall_counts.columns = ["Hall", "Count"]
-
-    fig1 = px.bar(
-        hall_counts,
-        x="Hall",
-        y="Count",
-        title="Number of Classes per Hall",
-        text="Count"
-    )
-    st.plotly_chart(fig1, use_container_width=True)
+    st.plotly_chart(build_hall_count_fig(data_key, df_valid), use_container_width=True)
 
     # ---------------------------------------------------------
     # --------- VISUAL 2: Total minutes per hall --------------
     # ---------------------------------------------------------
 
     st.header("⏱ Total Minutes Each Hall is Used")
-
-    hall_minutes = df_valid.groupby("Hall")["Duration"].sum().reset_index()
-    hall_minutes.columns = ["Hall", "Total_Minutes"]
-
-    fig2 = px.bar(
-        hall_minutes,
-        x="Hall",
-        y="Total_Minutes",
-        title="Total Usage (Minutes) per Hall",
-        text="Total_Minutes"
-    )
-    st.plotly_chart(fig2, use_container_width=True)
+    st.plotly_chart(build_hall_minutes_fig(data_key, df_valid), use_container_width=True)
 
     # ---------------------------------------------------------
     # --------- VISUAL 3: Distribution of Start Hours ---------
     # ---------------------------------------------------------
 
     st.header("🕒 Distribution of Class Start Hours")
-
-    fig3 = px.histogram(
-        df_valid,
-        x="Start_Hour",
-        title="Class Start Time Distribution",
-        nbins=24
-    )
-    st.plotly_chart(fig3, use_container_width=True)
+    st.plotly_chart(build_start_hour_fig(data_key, df_valid), use_container_width=True)
 
 
     # ---------------------------------------------------------
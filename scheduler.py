@@ -1,31 +1,60 @@
 """
 scheduler.py
 -------------
-This script automatically fetches updated data from the Google Sheet
-on a fixed schedule and writes it to the local CSV file
-(latest_schedule.csv). This enables automated data orchestration
+This script polls the Google Sheet on a fixed schedule and, when the
+sheet has changed, fetches it and writes it to the local Arrow IPC file
+(latest_schedule.arrow). This enables automated data orchestration
 for the Streamlit dashboard.
+
+Each poll only asks Drive for the sheet's modifiedTime; the full grid
+is downloaded only when that timestamp differs from the last one seen
+(stored in .last_modified), or when the output file is missing.
 """
 
 from apscheduler.schedulers.blocking import BlockingScheduler
 from datetime import datetime
-from fetch_from_gsheet import fetch_sheet
+import os
+from fetch_from_gsheet import OUTPUT_FILE, fetch_sheet, sheet_modified_time
+
+LAST_MODIFIED_FILE = ".last_modified"
+POLL_MINUTES = 5
+
+
+def read_last_modified():
+    """Return the modifiedTime recorded by the last successful fetch, if any."""
+    if not os.path.exists(LAST_MODIFIED_FILE):
+        return None
+    with open(LAST_MODIFIED_FILE) as f:
+        return f.read().strip()
+
+
+def write_last_modified(modified):
+    with open(LAST_MODIFIED_FILE, "w") as f:
+        f.write(modified)
 
 
 def scheduled_job():
     """
     This function is executed at each scheduled interval.
-    It calls the Google Sheet fetch function and prints logs.
+    It checks whether the Google Sheet changed, fetches it if so,
+    and prints logs.
     """
     print("\n----------------------------------------------------")
     print("Scheduler Triggered at:", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-    
+
     try:
-        fetch_sheet()  # Fetches data from Google Sheets and saves CSV
-        print("Fetch successful.")
+        modified = sheet_modified_time()
+
+        # A missing output (first run, renamed or deleted file) always refetches
+        if modified == read_last_modified() and os.path.exists(OUTPUT_FILE):
+            print("Sheet unchanged since", modified, "- skipping fetch.")
+        else:
+            fetch_sheet()  # Fetches data from Google Sheets and saves the Arrow file
+            write_last_modified(modified)
+            print("Fetch successful.")
     except Exception as e:
         print("Error during fetch:", str(e))
-    
+
     print("----------------------------------------------------\n")
 
 
@@ -34,12 +63,12 @@ if __name__ == "__main__":
     # Create scheduler instance
     scheduler = BlockingScheduler()
 
-    # Schedule the job: runs every 6 hours (you can change the interval)
-    scheduler.add_job(scheduled_job, "interval", hours=6)
+    # Schedule the job: polls every POLL_MINUTES minutes (you can change the interval)
+    scheduler.add_job(scheduled_job, "interval", minutes=POLL_MINUTES)
 
     print("====================================================")
     print(" AUTONOMOUS DATA SCHEDULER STARTED")
-    print(" Updates occur every 6 hours")
+    print(f" Checks for updates every {POLL_MINUTES} minutes")
     print(" Press CTRL+C to stop")
     print("====================================================\n")
 